@@ -1,5 +1,5 @@
 """AI Agent Hub package initialization."""
 
-from ai_agent_os.envelope import Envelope
+from ai_agent_os.envelope import Envelope, FrozenPayload
 
-__all__ = ["Envelope"]
+__all__ = ["Envelope", "FrozenPayload"]
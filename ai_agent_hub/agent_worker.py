@@ -1,16 +1,23 @@
 """Agent worker that processes queued envelopes and dispatches intents."""
 from __future__ import annotations
 
-import json
+import heapq
+import logging
 import os
-import textwrap
 import time
 from pathlib import Path
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from ai_agent_hub import Envelope
+import orjson
+
+try:
+    import watchfiles
+except ImportError:  # pragma: no cover - optional dependency
+    watchfiles = None
+
+from ai_agent_hub import Envelope, FrozenPayload
 from ai_agent_hub.lmtp_handler import get_queue_dir
-from ai_agent_hub.smtp_sender import send_envelope_via_smtp
+from ai_agent_hub.smtp_sender import send_envelope_via_smtp, send_envelopes_batch
 
 PROCESSED_DIR = Path(
     os.environ.get("AI_AGENT_HUB_PROCESSED_DIR")
@@ -18,8 +25,28 @@ PROCESSED_DIR = Path(
     or "./processed"
 )
 
+# Queue files that cannot be parsed into an envelope are parked here.
+FAILED_DIR = Path(
+    os.environ.get("AI_AGENT_HUB_FAILED_DIR")
+    or os.environ.get("AGENT_HUB_FAILED_DIR")
+    or "./failed"
+)
+
+# Maximum number of envelopes handled before their replies are flushed.
+BATCH_SIZE = 32
+
+logger = logging.getLogger("ai_agent_hub.agent_worker")
+
 
 INTENT_HANDLERS: Dict[str, Callable[[Envelope], Optional[Any]]] = {}
+# Bound once to the live dict, so direct registrations are dispatched too.
+_dispatch = INTENT_HANDLERS.get
+
+_PONG_PAYLOAD = FrozenPayload(pong=True)
+_UNKNOWN_PAYLOAD = FrozenPayload(error="unknown intent")
+# Reply for ``help``/``list-intents``, rebuilt only when the registered names change.
+_HELP_PAYLOAD = FrozenPayload(intents=[])
+_HELP_NAMES: frozenset = frozenset()
 
 
 def intent_handler(name: str) -> Callable[[Callable[[Envelope], Optional[Any]]], Callable[[Envelope], Optional[Any]]]:
@@ -32,55 +59,69 @@ def intent_handler(name: str) -> Callable[[Callable[[Envelope], Optional[Any]]],
     return decorator
 
 
-def _find_oldest_queue_file() -> Optional[Path]:
-    queue_dir = get_queue_dir()
-    if not queue_dir.exists():
-        return None
+def _queued_files() -> List[Tuple[float, Path]]:
+    """Return ``(mtime, path)`` pairs for every file currently in the queue."""
+
+    # ``DirEntry.is_file`` answers from the readdir type field, so each entry
+    # costs one stat (for the mtime) instead of two.
+    try:
+        with os.scandir(get_queue_dir()) as entries:
+            # Only committed ``*.json`` files; ``*.json.tmp`` files are still being written.
+            return [
+                (entry.stat().st_mtime, Path(entry.path))
+                for entry in entries
+                if entry.name.endswith(".json") and entry.is_file()
+            ]
+    except FileNotFoundError:
+        return []
+
 
-    files = [p for p in queue_dir.iterdir() if p.is_file()]
+def _find_oldest_queue_file() -> Optional[Path]:
+    files = _queued_files()
     if not files:
         return None
 
-    return sorted(files, key=lambda p: p.stat().st_mtime)[0]
+    return min(files)[1]
 
 
 def _load_envelope(file_path: Path) -> Envelope:
-    raw = file_path.read_text(encoding="utf-8")
-    return Envelope.from_json(raw)
+    return Envelope.from_json(file_path.read_bytes())
 
 
 def _extract_intent(env: Envelope) -> Optional[str]:
-    payload = env.payload
-    if isinstance(payload, dict):
-        intent = payload.get("intent")
-        if isinstance(intent, str):
-            return intent
-    return None
+    # Payloads are dicts on the hot path; text payloads raise TypeError.
+    try:
+        intent = env.payload["intent"]
+    except (TypeError, KeyError):
+        return None
+    return intent if type(intent) is str else None
 
 
 @intent_handler("ping")
 def _handle_ping(_: Envelope) -> dict:
-    return {"pong": True}
+    return _PONG_PAYLOAD
 
 
 @intent_handler("echo")
 def _handle_echo(env: Envelope) -> dict:
-    text = ""
-    if isinstance(env.payload, dict):
-        text_val = env.payload.get("text")
-        if isinstance(text_val, str):
-            text = text_val
-        else:
-            text = json.dumps(env.payload, ensure_ascii=False)
-    else:
-        text = str(env.payload)
-    return {"echo": text}
+    payload = env.payload
+    if isinstance(payload, dict):
+        text = payload.get("text")
+        # Without a text field the object itself is echoed; the reply
+        # serializer encodes it once instead of nesting a JSON string.
+        return {"echo": text if isinstance(text, str) else payload}
+    return {"echo": payload}
 
 
 @intent_handler("help")
 @intent_handler("list-intents")
 def _handle_help(_: Envelope) -> dict:
-    return {"intents": sorted(INTENT_HANDLERS.keys())}
+    global _HELP_PAYLOAD, _HELP_NAMES
+    # A set comparison is cheaper than re-sorting the names on every request.
+    if INTENT_HANDLERS.keys() != _HELP_NAMES:
+        _HELP_NAMES = frozenset(INTENT_HANDLERS)
+        _HELP_PAYLOAD = FrozenPayload(intents=sorted(_HELP_NAMES))
+    return _HELP_PAYLOAD
 
 
 @intent_handler("summarize")
@@ -91,11 +132,11 @@ def _handle_summarize(env: Envelope) -> dict:
         if isinstance(payload_text, str):
             text = payload_text
         else:
-            text = json.dumps(env.payload, ensure_ascii=False)
+            text = orjson.dumps(env.payload).decode("utf-8")
     else:
         text = str(env.payload)
 
-    summary = textwrap.shorten(text, width=100, placeholder="…")
+    summary = text if len(text) <= 100 else text[:99].rstrip() + "…"
     return {"summary": summary}
 
 
@@ -110,26 +151,25 @@ def _build_reply(env: Envelope, result_payload: Any) -> Envelope:
     )
 
 
+def _handle_unknown(_: Envelope) -> dict:
+    """Fallback for intents without a registered handler; never registered itself."""
+
+    return _UNKNOWN_PAYLOAD
+
+
 def _handle_envelope(env: Envelope) -> Optional[Envelope]:
     intent_name = _extract_intent(env)
     if not intent_name:
-        print("No intent found; skipping envelope", env.id)
+        logger.info("No intent found; skipping envelope %s", env.id)
         return None
 
-    handler = INTENT_HANDLERS.get(intent_name)
-
-    if handler:
-        print(
-            f"[agent_worker] intent={intent_name} from={env.sender} → handler={handler.__name__}"
-        )
-        try:
-            reply_payload = handler(env)
-        except Exception as exc:  # pragma: no cover - safeguard
-            print(f"Handler error for intent '{intent_name}': {exc}")
-            reply_payload = {"error": str(exc)}
-    else:
-        print(f"[agent_worker] intent={intent_name} from={env.sender} → handler=UNKNOWN")
-        reply_payload = {"error": "unknown intent"}
+    handler = _dispatch(intent_name, _handle_unknown)
+    logger.info("intent=%s from=%s → handler=%s", intent_name, env.sender, handler.__name__)
+    try:
+        reply_payload = handler(env)
+    except Exception as exc:  # pragma: no cover - safeguard
+        logger.error("Handler error for intent '%s': %s", intent_name, exc)
+        reply_payload = {"error": str(exc)}
 
     if reply_payload is None:
         return None
@@ -137,30 +177,187 @@ def _handle_envelope(env: Envelope) -> Optional[Envelope]:
     return _build_reply(env, reply_payload)
 
 
-def process_next_envelope() -> bool:
-    """Process the oldest envelope in the queue if present."""
+def _move_into(directory: Path, file_path: Path) -> None:
+    destination = directory / file_path.name
+    try:
+        os.replace(file_path, destination)
+    except FileNotFoundError:
+        if not file_path.exists():
+            raise
+        directory.mkdir(parents=True, exist_ok=True)
+        os.replace(file_path, destination)
 
-    file_path = _find_oldest_queue_file()
-    if not file_path:
-        return False
+
+def _move_to_processed(file_path: Path) -> None:
+    _move_into(PROCESSED_DIR, file_path)
+
+
+def _process_file(file_path: Path) -> Optional[Envelope]:
+    """Handle a queued envelope file, move it to the processed dir, return the reply."""
 
     env = _load_envelope(file_path)
     reply = _handle_envelope(env)
+    _move_to_processed(file_path)
+    return reply
+
+
+def _process_queued_file(file_path: Path) -> Optional[Envelope]:
+    """Like ``_process_file``, but park unreadable files in ``FAILED_DIR``.
+
+    Used by the batch loops so one bad file cannot abort a batch whose earlier
+    files are already retired. ``FileNotFoundError`` still propagates: the file
+    was claimed by another worker and the caller skips it.
+    """
+
+    try:
+        env = _load_envelope(file_path)
+    except (ValueError, TypeError, KeyError) as exc:
+        logger.error(
+            "Cannot load envelope %s, moving it to %s: %s", file_path.name, FAILED_DIR, exc
+        )
+        _move_into(FAILED_DIR, file_path)
+        return None
+    reply = _handle_envelope(env)
+    _move_to_processed(file_path)
+    return reply
+
+
+def process_envelope(env: Envelope, file_path: Path) -> Optional[Envelope]:
+    """Handle an envelope that is already in memory and retire its queue file.
 
-    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
-    destination = PROCESSED_DIR / file_path.name
-    file_path.rename(destination)
+    Used by the LMTP server's in-process workers, which get the envelope
+    straight from intake instead of re-reading it. The queue file is claimed by
+    moving it first, so an envelope that a polling worker grabbed in the
+    meantime is not handled twice.
+    """
 
+    try:
+        _move_to_processed(file_path)
+    except FileNotFoundError:
+        return None
+    return _handle_envelope(env)
+
+
+def process_envelope_file(file_path: Path) -> None:
+    """Handle a single queued envelope file and send its reply right away."""
+
+    reply = _process_file(file_path)
     if reply:
         send_envelope_via_smtp(reply)
+
+
+def process_next_envelope() -> bool:
+    """Process the oldest envelope in the queue if present."""
+
+    file_path = _find_oldest_queue_file()
+    if not file_path:
+        return False
+
+    process_envelope_file(file_path)
     return True
 
 
-def main(poll_interval: float = 1.0) -> None:
-    """Continuously watch the queue directory and process envelopes."""
+def process_pending_envelopes(limit: int = BATCH_SIZE) -> int:
+    """Process up to ``limit`` queued envelopes, oldest first.
+
+    The queue is scanned once per batch rather than once per envelope. Replies
+    are collected and flushed together once the batch is done, so a queue
+    burst shares one SMTP session instead of interleaving file and network
+    work per envelope. Unreadable files are moved to ``FAILED_DIR``, and
+    replies collected so far are sent even if the batch is cut short. Returns
+    the number of queue files retired.
+    """
+
+    replies: List[Envelope] = []
+    processed = 0
+    try:
+        for _, file_path in heapq.nsmallest(limit, _queued_files()):
+            try:
+                reply = _process_queued_file(file_path)
+            except FileNotFoundError:
+                # Claimed by another worker since the scan.
+                continue
+            if reply:
+                replies.append(reply)
+            processed += 1
+    finally:
+        if replies:
+            send_envelopes_batch(replies)
+    return processed
+
+
+def _only_added(change: "watchfiles.Change", path: str) -> bool:
+    return change == watchfiles.Change.added and path.endswith(".json")
+
+
+def _drain(pending: List[Tuple[float, Path]]) -> None:
+    replies: List[Envelope] = []
+    try:
+        while pending:
+            _, file_path = heapq.heappop(pending)
+            try:
+                reply = _process_queued_file(file_path)
+            except FileNotFoundError:
+                # Queued twice (startup scan + event) or claimed elsewhere.
+                continue
+            if reply:
+                replies.append(reply)
+            if len(replies) >= BATCH_SIZE:
+                send_envelopes_batch(replies)
+                replies = []
+    finally:
+        if replies:
+            send_envelopes_batch(replies)
+
+
+def _watch_queue(rescan_interval: float) -> None:
+    """Process envelopes as inotify reports them instead of polling the queue.
+
+    The heap is seeded from a single directory scan; after that only newly
+    added paths are pushed. Idle timeouts trigger a rescan so that files created
+    before the watcher was armed are never stranded.
+    """
+
+    queue_dir = get_queue_dir()
+    queue_dir.mkdir(parents=True, exist_ok=True)
+
+    pending = _queued_files()
+    heapq.heapify(pending)
+    _drain(pending)
+
+    for changes in watchfiles.watch(
+        queue_dir,
+        watch_filter=_only_added,
+        rust_timeout=int(rescan_interval * 1000),
+        yield_on_timeout=True,
+    ):
+        if not changes:
+            pending = _queued_files()
+            heapq.heapify(pending)
+        for _, raw_path in changes:
+            file_path = Path(raw_path)
+            try:
+                heapq.heappush(pending, (file_path.stat().st_mtime, file_path))
+            except FileNotFoundError:
+                continue
+        _drain(pending)
+
+
+def main(poll_interval: float = 1.0, rescan_interval: float = 30.0) -> None:
+    """Continuously watch the queue directory and process envelopes.
+
+    Uses inotify via ``watchfiles`` when installed and falls back to polling
+    every ``poll_interval`` seconds otherwise.
+    """
+
+    logging.basicConfig(level=logging.INFO, format="[%(name)s] %(message)s")
+
+    if watchfiles is not None:
+        _watch_queue(rescan_interval)
+        return
 
     while True:
-        processed = process_next_envelope()
+        processed = process_pending_envelopes()
         if not processed:
             time.sleep(poll_interval)
 
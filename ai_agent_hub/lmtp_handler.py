@@ -6,23 +6,38 @@ exposes helper functions reused by the asyncio LMTP server implementation.
 
 from __future__ import annotations
 
-import json
+import binascii
+import logging
 import os
 import re
 from datetime import timezone
+from email import message_from_bytes
 from pathlib import Path
+from typing import Any
+
+import orjson
 
 from ai_agent_hub import Envelope
 
+logger = logging.getLogger(__name__)
+
+
+# ActivityPub Agent ID pattern: https://domain/@name. Whitespace inside the
+# scheme separator (e.g. folded headers) is tolerated and stripped afterwards.
+_AGENT_ID_PATTERN = re.compile(r"https?\s*:\s*/\s*/[a-zA-Z0-9.\-]+/@[a-zA-Z0-9_.\-]+")
 
-# ActivityPub Agent ID pattern: https://domain/@name
-_AGENT_ID_PATTERN = re.compile(r"(https?://[a-zA-Z0-9.\-]+/@[a-zA-Z0-9_.\-]+)")
+# Headers needed by the fast path; the first occurrence of each one wins.
+_HEADER_PATTERN = re.compile(
+    rb"(?im)^(From|To|Content-Type|Content-Transfer-Encoding):[ \t]*(.*?)\r?$"
+)
+_FOLDED_LINE = re.compile(rb"\r?\n[ \t]+")
 
 __all__ = [
     "get_queue_dir",
     "extract_sender",
     "extract_recipient",
     "extract_body",
+    "parse_message",
     "save_envelope",
 ]
 
@@ -55,15 +70,9 @@ def _extract_agent_id(raw_header: str | None) -> str:
     if not raw_header:
         return "https://unknown/@unknown"
 
-    sanitized = re.sub(r"[<>]", " ", raw_header)
-    sanitized = re.sub(
-        r"https?\s*:\s*//",
-        lambda m: m.group(0).replace(" ", ""),
-        sanitized,
-    )
-    match = _AGENT_ID_PATTERN.search(sanitized)
+    match = _AGENT_ID_PATTERN.search(raw_header)
     if match:
-        return match.group(1).rstrip("/")
+        return "".join(match.group(0).split())
 
     return "https://unknown/@unknown"
 
@@ -71,37 +80,127 @@ def _extract_agent_id(raw_header: str | None) -> str:
 def extract_body(msg) -> str:
     """Extract body and auto-parse JSON if applicable."""
 
-    if msg.is_multipart():
-        for part in msg.walk():
-            if part.get_content_type() == "text/plain":
-                raw = part.get_payload(decode=True).decode(errors="replace")
-                return _maybe_json(raw)
-        return ""
-
-    payload = msg.get_payload(decode=True)
-    text = (
-        payload.decode(errors="replace")
-        if isinstance(payload, (bytes, bytearray))
-        else str(payload)
+    if not msg.is_multipart():
+        payload = msg.get_payload(decode=True)
+        return _maybe_json(
+            payload.decode(errors="replace")
+            if isinstance(payload, (bytes, bytearray))
+            else str(payload)
+        )
+
+    for part in msg.walk():
+        if part.get_content_type() == "text/plain":
+            raw = part.get_payload(decode=True).decode(errors="replace")
+            return _maybe_json(raw)
+    return ""
+
+
+def _fast_parse(raw_bytes: bytes) -> tuple[str, str, bytes] | None:
+    """Split a single-part message into ``(From, To, decoded body)``.
+
+    Returns ``None`` whenever the message needs the full ``email`` parser:
+    multipart bodies, RFC 2047 encoded headers, or unknown transfer encodings.
+    """
+
+    header_blob, sep, body = raw_bytes.partition(b"\r\n\r\n")
+    if not sep:
+        header_blob, sep, body = raw_bytes.partition(b"\n\n")
+        if not sep:
+            return None
+
+    headers: dict[bytes, bytes] = {}
+    for match in _HEADER_PATTERN.finditer(_FOLDED_LINE.sub(b" ", header_blob)):
+        headers.setdefault(match.group(1).lower(), match.group(2))
+
+    if headers.get(b"content-type", b"").lower().startswith(b"multipart/"):
+        return None
+
+    from_hdr = headers.get(b"from", b"")
+    to_hdr = headers.get(b"to", b"")
+    if b"=?" in from_hdr or b"=?" in to_hdr:
+        return None
+
+    cte = headers.get(b"content-transfer-encoding", b"7bit").strip().lower()
+    try:
+        if cte == b"base64":
+            body = binascii.a2b_base64(body)
+        elif cte == b"quoted-printable":
+            body = binascii.a2b_qp(body)
+        elif cte not in (b"7bit", b"8bit", b"binary"):
+            return None
+    except binascii.Error:
+        return None
+
+    return from_hdr.decode(errors="replace"), to_hdr.decode(errors="replace"), body
+
+
+def parse_message(raw_bytes: bytes) -> tuple[str, str, Any]:
+    """Return ``(sender, recipient, payload)`` for a raw LMTP message.
+
+    Single-part messages, such as those built by ``smtp_sender``, are split
+    directly on the header/body boundary; everything else goes through
+    ``email.message_from_bytes`` and the ``extract_*`` helpers.
+    """
+
+    parsed = _fast_parse(raw_bytes)
+    if parsed is None:
+        msg = message_from_bytes(raw_bytes)
+        return extract_sender(msg), extract_recipient(msg), extract_body(msg)
+
+    from_hdr, to_hdr, body = parsed
+    return (
+        _extract_agent_id(from_hdr),
+        _extract_agent_id(to_hdr),
+        _maybe_json(body.decode(errors="replace")),
     )
-    return _maybe_json(text)
 
 
 def _maybe_json(text: str):
     try:
-        return json.loads(text)
-    except Exception:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
         return text
 
 
-def save_envelope(env: Envelope):
+def _write_file(path: Path, data: bytes) -> None:
+    """Atomically write ``data`` to ``path`` with bare fd syscalls.
+
+    The bytes land in a ``.tmp`` sibling, are fsynced, and are then moved into
+    place with a single ``os.replace``, so readers never observe a partial
+    file. Skipping the buffered-IO layer also saves an ``fstat`` and ``ioctl``.
+    """
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        os.fsync(fd)
+    except BaseException:
+        os.close(fd)
+        os.unlink(tmp_path)
+        raise
+    os.close(fd)
+    os.replace(tmp_path, path)
+
+
+def save_envelope(env: Envelope) -> Path:
     """Persist an envelope to the queue directory using an OS-safe filename."""
 
     queue_dir = get_queue_dir()
-    queue_dir.mkdir(parents=True, exist_ok=True)
     timestamp = env.created_at.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
     fname = f"{timestamp}_{env.id}.json"
     fpath = queue_dir / fname
-    with fpath.open("w", encoding="utf-8") as f:
-        f.write(env.to_json(indent=2))
-    print(f"Saved envelope → {fpath}")
+    # Compact by default; set AI_AGENT_HUB_PRETTY_QUEUE to inspect files by hand.
+    option = orjson.OPT_APPEND_NEWLINE
+    if os.environ.get("AI_AGENT_HUB_PRETTY_QUEUE"):
+        option |= orjson.OPT_INDENT_2
+    data = orjson.dumps(env.to_dict(), option=option)
+    try:
+        _write_file(fpath, data)
+    except FileNotFoundError:
+        queue_dir.mkdir(parents=True, exist_ok=True)
+        _write_file(fpath, data)
+    logger.info("Saved envelope → %s", fpath)
+    return fpath
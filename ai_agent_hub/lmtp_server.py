@@ -3,44 +3,115 @@
 from __future__ import annotations
 
 import asyncio
+import logging
 import os
+import queue
+import signal
 import sys
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from email import message_from_bytes
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
 from typing import Awaitable, Callable
 
 from ai_agent_hub import Envelope
+from ai_agent_hub import agent_worker
 # Helper functions migrated from the former aiosmtpd handler:
-# extract_sender, extract_recipient, extract_body, save_envelope
-from ai_agent_hub.lmtp_handler import (
-    extract_body,
-    extract_recipient,
-    extract_sender,
-    save_envelope,
-)
+# parse_message, save_envelope
+from ai_agent_hub.lmtp_handler import parse_message, save_envelope
+from ai_agent_hub.smtp_sender import send_envelope_via_smtp
+
+try:
+    import uvloop
+except ImportError:  # pragma: no cover - optional dependency
+    uvloop = None
 
 DEBUG_LOG = "/tmp/lmtp_debug.log"
+# Upper bound for a DATA payload; enforced by ``read_data`` across all reads.
+MAX_MESSAGE_SIZE = 10 * 1024 * 1024
+
+
+# Named explicitly: under ``python -m`` this module's __name__ is "__main__".
+logger = logging.getLogger("ai_agent_hub.lmtp_server")
+
+
+def start_logging() -> QueueListener:
+    """Route ``ai_agent_hub`` logs through a background listener thread.
+
+    Debug records go to ``DEBUG_LOG`` and INFO and above also go to stdout.
+    Handlers run on the listener thread, so the event loop only enqueues
+    records and never blocks on file I/O.
+    """
+
+    file_handler = logging.FileHandler(DEBUG_LOG)
+    file_handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setLevel(logging.INFO)
+
+    records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    hub_logger = logging.getLogger("ai_agent_hub")
+    hub_logger.setLevel(logging.DEBUG)
+    hub_logger.addHandler(QueueHandler(records))
 
+    listener = QueueListener(records, file_handler, stream_handler, respect_handler_level=True)
+    listener.start()
+    return listener
 
-def debug(*args: object) -> None:
-    with open(DEBUG_LOG, "a") as f:
-        print(*args, file=f, flush=True)
 
 ResponseWriter = Callable[[str], Awaitable[None]]
 
 
+async def read_data(
+    reader: asyncio.StreamReader, max_size: int = MAX_MESSAGE_SIZE
+) -> bytes:
+    """Read a DATA payload up to the lone ``.`` line and undo dot-stuffing.
+
+    The payload is pulled with ``readuntil`` in as few reads as the stream
+    allows instead of awaiting every line. Lines that merely end in ``.`` stop
+    a read early, so the loop continues until the dot stands alone. The stream
+    limit only bounds a single read, so the running total is checked here and
+    ``asyncio.LimitOverrunError`` is raised once it exceeds ``max_size``.
+    """
+
+    chunks: list[bytes] = []
+    total = 0
+    while True:
+        chunk = await reader.readuntil(b".\r\n")
+        total += len(chunk)
+        if total > max_size:
+            raise asyncio.LimitOverrunError(
+                "DATA exceeds the maximum message size", total
+            )
+        chunks.append(chunk)
+        # A 3-byte chunk always follows a previous CRLF or starts the payload.
+        if len(chunk) == 3 or chunk[-4:-3] == b"\n":
+            break
+
+    data = b"".join(chunks)[:-3]
+    return (b"\n" + data).replace(b"\n..", b"\n.")[1:]
+
+
 class LMTPServer:
     """Minimal LMTP server using asyncio streams.
 
     The server accepts a single message at a time and converts it into an
     Envelope saved to the queue directory. Designed for compatibility with
     Postfix using ``lmtp:inet:localhost:8024``.
+
+    With ``workers > 0`` the server also dispatches intents itself: accepted
+    envelopes are handed to worker coroutines through ``envelope_queue`` and
+    the queue file is only kept as a durability record, so no separate
+    polling ``agent_worker`` process is needed.
     """
 
-    def __init__(self, port: int = 8024) -> None:
+    def __init__(self, port: int = 8024, workers: int = 0) -> None:
         self.port = port
+        self.workers = workers
+        self.envelope_queue: asyncio.Queue[tuple[Envelope, Path]] = asyncio.Queue()
         self._server: asyncio.AbstractServer | None = None
+        # A single thread owns the SMTP connection used for replies.
+        self._smtp_executor: ThreadPoolExecutor | None = None
 
     async def start(self) -> None:
         self._server = await asyncio.start_server(
@@ -48,9 +119,10 @@ class LMTPServer:
             host="127.0.0.1",
             port=self.port,
             reuse_address=True,
+            limit=MAX_MESSAGE_SIZE,
         )
         addr = self._server.sockets[0].getsockname() if self._server.sockets else "unknown"
-        debug(f"✅ LMTP server bound to {addr}")
+        logger.debug("✅ LMTP server bound to %s", addr)
         print(f"AI Agent Hub asyncio LMTP server listening on {addr}")
         print(
             f"LMTP server startup OK. Listening on 127.0.0.1:{self.port}",
@@ -62,7 +134,30 @@ class LMTPServer:
             await self.start()
         assert self._server is not None
         async with self._server:
-            await self._server.serve_forever()
+            if not self.workers:
+                await self._server.serve_forever()
+                return
+            self._smtp_executor = ThreadPoolExecutor(max_workers=1)
+            try:
+                await asyncio.gather(
+                    self._server.serve_forever(),
+                    *(self._worker_loop() for _ in range(self.workers)),
+                )
+            finally:
+                self._smtp_executor.shutdown(wait=False)
+
+    async def _worker_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            env, path = await self.envelope_queue.get()
+            try:
+                reply = await asyncio.to_thread(agent_worker.process_envelope, env, path)
+                if reply is not None:
+                    await loop.run_in_executor(self._smtp_executor, send_envelope_via_smtp, reply)
+            except Exception:
+                logger.exception("ERROR in LMTP worker")
+            finally:
+                self.envelope_queue.task_done()
 
     async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
         async def write_response(line: str) -> None:
@@ -73,25 +168,11 @@ class LMTPServer:
 
         mail_from: str | None = None
         recipients: list[str] = []
-        in_data_mode = False
-        data_lines: list[bytes] = []
 
         while not reader.at_eof():
             raw_line = await reader.readline()
             if raw_line == b"":
                 break
-            if in_data_mode:
-                if raw_line.rstrip() == b".":
-                    await self._process_message(data_lines, mail_from, recipients, write_response)
-                    in_data_mode = False
-                    data_lines = []
-                    mail_from = None
-                    recipients = []
-                    continue
-                if raw_line.startswith(b".."):
-                    raw_line = raw_line[1:]
-                data_lines.append(raw_line)
-                continue
 
             line = raw_line.decode(errors="replace").strip()
             upper = line.upper()
@@ -105,9 +186,17 @@ class LMTPServer:
                 recipients.append(line[8:].strip())
                 await write_response("250 OK")
             elif upper == "DATA":
-                in_data_mode = True
-                data_lines = []
                 await write_response("354 Start mail input; end with <CRLF>.<CRLF>")
+                try:
+                    raw_bytes = await read_data(reader, MAX_MESSAGE_SIZE)
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    await write_response("552 Message size exceeds fixed maximum message size")
+                    break
+                await self._process_message(raw_bytes, mail_from, recipients, write_response)
+                mail_from = None
+                recipients = []
             elif upper == "QUIT":
                 await write_response("221 Bye")
                 break
@@ -122,29 +211,25 @@ class LMTPServer:
 
     async def _process_message(
         self,
-        data_lines: list[bytes],
+        raw_bytes: bytes,
         mail_from: str | None,
         recipients: list[str],
         write_response: ResponseWriter,
     ) -> None:
-        message_id = str(uuid.uuid4())
-        raw_bytes = b"".join(data_lines)
+        message_id = uuid.uuid4().hex
 
-        debug("----- PROCESS MESSAGE -----")
-        debug("raw_bytes =", data_lines)
-        debug("mail_from =", mail_from)
-        debug("recipients =", recipients)
+        logger.debug(
+            "----- PROCESS MESSAGE ----- raw_bytes=%r mail_from=%s recipients=%s",
+            raw_bytes,
+            mail_from,
+            recipients,
+        )
 
         try:
-            # Parse MIME
-            msg = message_from_bytes(raw_bytes)
-
-            # Extract AP IDs
-            sender = extract_sender(msg)
-            recipient = extract_recipient(msg)
+            # Extract AP IDs and payload (fast path skips the email parser)
+            sender, recipient, payload_data = parse_message(raw_bytes)
 
-            # Extract payload and optional metadata
-            payload_data = extract_body(msg)
+            # Extract optional metadata
             context = None
             in_reply_to = None
             created_at = datetime.now(timezone.utc)
@@ -180,41 +265,47 @@ class LMTPServer:
                 created_at=created_at,
             )
 
-            # Save to queue
-            save_envelope(env)
+            # Save to queue, then hand off to in-process workers if enabled
+            queue_path = save_envelope(env)
+            if self.workers:
+                self.envelope_queue.put_nowait((env, queue_path))
 
-            debug("SAVED ENVELOPE:", env.id)
-            debug("QUEUE PATH:", env.sender, env.recipient)
+            logger.debug("SAVED ENVELOPE: %s %s → %s", env.id, env.sender, env.recipient)
 
             await write_response(f"250 OK queued as {message_id}")
 
-        except Exception as exc:
+        except Exception:
             # 🔥 FULL traceback を systemd に流す
-            import traceback
-
-            tb = traceback.format_exc()
-            debug("ERROR in LMTP processing:", tb)
+            logger.exception("ERROR in LMTP processing")
 
             await write_response("451 Requested action aborted: processing error")
 
 
 def main() -> None:
-    debug("=== LMTP SERVER STARTING ===")
-    debug("Python:", sys.version)
-    debug("CWD:", os.getcwd())
-    debug("PYTHONPATH:", sys.path)
-    debug("QUEUE_DIR env:", os.environ.get("AI_AGENT_HUB_QUEUE_DIR"))
+    listener = start_logging()
+    # SIGTERM (systemd stop) would otherwise kill the process without unwinding,
+    # leaving queued log records unwritten and the log fd unclosed.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    logger.debug("=== LMTP SERVER STARTING ===")
+    logger.debug("Python: %s", sys.version)
+    logger.debug("CWD: %s", os.getcwd())
+    logger.debug("PYTHONPATH: %s", sys.path)
+    logger.debug("QUEUE_DIR env: %s", os.environ.get("AI_AGENT_HUB_QUEUE_DIR"))
 
     try:
-        server = LMTPServer()
-        debug("LMTPServer instance created")
+        workers = int(os.environ.get("AI_AGENT_HUB_LMTP_WORKERS") or 0)
+        server = LMTPServer(workers=workers)
+        logger.debug("LMTPServer instance created")
+        if uvloop is not None:
+            # uvloop.run() only exists from 0.18; install() covers older releases.
+            logger.debug("Event loop: uvloop")
+            uvloop.install()
         asyncio.run(server.serve_forever())
-    except Exception as exc:
-        debug("FATAL ERROR:", exc)
-        import traceback
-
-        debug(traceback.format_exc())
+    except Exception:
+        logger.exception("FATAL ERROR")
         sys.exit(1)
+    finally:
+        listener.stop()
 
 
 if __name__ == "__main__":
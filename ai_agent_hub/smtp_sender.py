@@ -1,50 +1,410 @@
 """SMTP sender for AI Agent Hub envelopes."""
 from __future__ import annotations
 
-import json
+import atexit
+import binascii
+import functools
+import queue
 import smtplib
-from email.message import EmailMessage
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta, timezone
+from email.message import Message
+from email.policy import compat32
 from email.utils import format_datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+import orjson
 
 from ai_agent_hub import Envelope
 
+SMTP_HOST = "localhost"
+SMTP_PORT = 25
+# Probe a cached connection with NOOP once this many messages went through it.
+NOOP_EVERY = 50
+# Replace a connection after this many messages to dodge server-side limits.
+MAX_SENDS_PER_CONNECTION = 100
+# Probe a connection with NOOP before reuse once it sat idle this many seconds;
+# Postfix drops idle sessions with "421 timeout" (smtpd_timeout).
+IDLE_PROBE_SECONDS = 30.0
+
+# SMTP envelope addresses must be addr-spec, not ActivityPub IDs.
+_SMTP_FROM = "agent@localhost"
+_SMTP_TO = ["worker@localhost"]
+
+_SUBJECT_PREFIX = "AI-Agent-Hub: "
+_MSGID_SUFFIX = "@ai-agent-hub>"
+
+# compat32 skips the RFC 5322 header model; CRLF matches what goes on the wire.
+_WIRE_POLICY = compat32.clone(linesep="\r\n")
+
+# Errors after which a cached connection is replaced and the send retried once;
+# SMTP replies only qualify when ``_connection_lost`` says so.
+_RECONNECT_ERRORS = (
+    smtplib.SMTPServerDisconnected,
+    ConnectionError,
+    smtplib.SMTPResponseException,
+)
+
+
+def _connection_lost(exc: Exception) -> bool:
+    """Whether ``exc`` means the session is gone rather than the message refused."""
+
+    # 421 is the server closing the session, e.g. Postfix's idle timeout.
+    return not isinstance(exc, smtplib.SMTPResponseException) or exc.smtp_code == 421
+
+
+@functools.lru_cache(maxsize=256)
+def _rfc2822(epoch_seconds: int, utc_offset: int) -> str:
+    tz = timezone(timedelta(seconds=utc_offset))
+    return format_datetime(datetime.fromtimestamp(epoch_seconds, tz))
 
-def _envelope_to_mime(env: Envelope) -> EmailMessage:
-    """Convert an envelope to a MIME email message."""
 
-    msg = EmailMessage()
+def _date_header(created_at: datetime) -> str:
+    """Format a ``Date:`` value, shared by envelopes created in the same second."""
+
+    offset = created_at.utcoffset()
+    return _rfc2822(int(created_at.timestamp()), int(offset.total_seconds()) if offset else 0)
+
+
+def _envelope_to_mime(env: Envelope) -> Message:
+    """Convert an envelope to a MIME email message.
+
+    Uses a plain compat32 ``Message``: headers are stored as given instead of
+    being parsed into header objects, and the body is attached already encoded.
+    """
+
+    msg = Message()
     # Preserve ActivityPub IDs in headers while supplying email addr-spec for transport
     msg["From"] = f"{env.sender} <agent@localhost>"
     msg["To"] = f"{env.recipient} <worker@localhost>"
-    msg["Subject"] = f"AI-Agent-Hub: {env.envelope_type}"
-    msg["Date"] = format_datetime(env.created_at)
-    msg["Message-ID"] = f"<{env.id}@ai-agent-hub>"
+    msg["Subject"] = _SUBJECT_PREFIX + env.envelope_type
+    msg["Date"] = _date_header(env.created_at)
+    msg["Message-ID"] = "<" + env.id + _MSGID_SUFFIX
+
+    cte, body = _encoded_body(env)
+    msg["MIME-Version"] = "1.0"
+    msg["Content-Type"] = "application/json"
+    msg["Content-Transfer-Encoding"] = cte
+    msg.set_payload(body)
+    return msg
+
+
+def _body_cte(body: bytes) -> str:
+    """Pick the lightest transfer encoding that keeps the body within SMTP limits.
+
+    The JSON body is a single line, so it can go out unencoded whenever it fits
+    in one 998-byte SMTP line; longer bodies fall back to base64.
+    """
 
-    body = json.dumps(
+    if len(body) > 998:
+        return "base64"
+    return "7bit" if body.isascii() else "8bit"
+
+
+def _body_bytes(env: Envelope) -> bytes:
+    """Serialize the JSON body around the envelope's cached payload bytes."""
+
+    meta_json = orjson.dumps(
         {
-            "payload": env.payload,
             "context": env.context,
             "inReplyTo": env.in_reply_to,
-            "time": env.created_at.isoformat(),
+            "time": env.iso_time(),
             "version": env.version,
-        },
-        ensure_ascii=False,
+        }
     )
-    msg.set_content(body, subtype="plain", charset="utf-8")
-    return msg
+    # One join allocates the body once instead of once per concatenation.
+    return b"".join((b'{"payload":', env.payload_json(), b",", memoryview(meta_json)[1:]))
+
+
+def _encoded_body(env: Envelope) -> Tuple[str, bytes]:
+    """Return the transfer encoding and the body bytes encoded with it."""
+
+    body = _body_bytes(env)
+    cte = _body_cte(body)
+    if cte == "base64":
+        body = b"\r\n".join(
+            binascii.b2a_base64(body[i:i + 57], newline=False)
+            for i in range(0, len(body), 57)
+        )
+    return cte, body
+
+
+def _build_wire_bytes(env: Envelope) -> bytes:
+    """Render the SMTP DATA bytes for an envelope without ``email.generator``.
+
+    Produces the same headers and JSON body as ``_envelope_to_mime``. The body
+    goes out unencoded when it fits in one SMTP line, and as base64 otherwise.
+    Header values that would need RFC 2047 encoding or could inject extra
+    header lines take the ``Message`` route instead, flattened straight to CRLF
+    bytes the way ``SMTP.send_message`` would.
+    """
+
+    header_values = (env.sender, env.recipient, env.envelope_type, env.id)
+    if not all(v.isascii() and "\r" not in v and "\n" not in v for v in header_values):
+        return _envelope_to_mime(env).as_bytes(policy=_WIRE_POLICY)
+
+    cte, body = _encoded_body(env)
+
+    head = (
+        f"From: {env.sender} <agent@localhost>\r\n"
+        f"To: {env.recipient} <worker@localhost>\r\n"
+        f"Subject: {_SUBJECT_PREFIX}{env.envelope_type}\r\n"
+        f"Date: {_date_header(env.created_at)}\r\n"
+        f"Message-ID: <{env.id}{_MSGID_SUFFIX}\r\n"
+        "MIME-Version: 1.0\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Transfer-Encoding: {cte}\r\n"
+        "\r\n"
+    )
+    return head.encode("ascii") + body
+
+
+class _Connection:
+    """An open SMTP session plus the counters used to probe and recycle it."""
+
+    def __init__(self, host: str, port: int) -> None:
+        self.smtp = smtplib.SMTP(host, port)
+        self.sends = 0
+        self.unchecked = 0
+        self.last_used = time.monotonic()
+        _OPEN_CONNECTIONS.add(self)
+
+    def sendmail(self, raw_message: bytes) -> None:
+        self.smtp.sendmail(_SMTP_FROM, _SMTP_TO, raw_message)
+        self.sends += 1
+        self.unchecked += 1
+        self.last_used = time.monotonic()
+
+    def needs_probe(self, noop_every: int, idle_probe: float) -> bool:
+        return (
+            self.unchecked >= noop_every
+            or time.monotonic() - self.last_used >= idle_probe
+        )
+
+    def is_alive(self) -> bool:
+        self.unchecked = 0
+        try:
+            code, _ = self.smtp.noop()
+        except (smtplib.SMTPException, OSError):
+            return False
+        self.last_used = time.monotonic()
+        return code == 250
+
+    def close(self) -> None:
+        """Close the session, ignoring errors from an already dead peer."""
+
+        _OPEN_CONNECTIONS.discard(self)
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self.smtp.close()
+
+
+_OPEN_CONNECTIONS: "weakref.WeakSet[_Connection]" = weakref.WeakSet()
+_LOCAL = threading.local()
+
+
+def _thread_connections() -> Dict[Tuple[str, int], _Connection]:
+    connections = getattr(_LOCAL, "connections", None)
+    if connections is None:
+        connections = _LOCAL.connections = {}
+    return connections
+
+
+class SmtpSender:
+    """Send envelopes over a cached SMTP connection per thread and server.
+
+    Connections live in a ``threading.local`` keyed by ``(host, port)``, so
+    consecutive sends skip the TCP and EHLO handshake without sharing a socket
+    across threads. A connection is probed with NOOP every ``noop_every``
+    messages and before reuse after ``idle_probe`` idle seconds, replaced after
+    ``max_sends``, and re-established once when the server turns out to have
+    dropped it.
+    """
+
+    def __init__(
+        self,
+        host: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        *,
+        noop_every: int = NOOP_EVERY,
+        max_sends: int = MAX_SENDS_PER_CONNECTION,
+        idle_probe: float = IDLE_PROBE_SECONDS,
+    ) -> None:
+        self.address = (host, port)
+        self.noop_every = noop_every
+        self.max_sends = max_sends
+        self.idle_probe = idle_probe
+
+    def _connection(self) -> _Connection:
+        connections = _thread_connections()
+        conn = connections.get(self.address)
+        if conn is not None and (
+            conn.sends >= self.max_sends
+            or (conn.needs_probe(self.noop_every, self.idle_probe) and not conn.is_alive())
+        ):
+            conn.close()
+            conn = None
+        if conn is None:
+            conn = connections[self.address] = _Connection(*self.address)
+        return conn
+
+    def _send_raw(self, raw_message: bytes) -> None:
+        conn = self._connection()
+        try:
+            conn.sendmail(raw_message)
+        except _RECONNECT_ERRORS as exc:
+            if not _connection_lost(exc):
+                raise
+            self.close()
+            self._connection().sendmail(raw_message)
+
+    def send(self, env: Envelope) -> None:
+        """Send a single envelope."""
+
+        self._send_raw(_build_wire_bytes(env))
+
+    def send_many(self, envs: Iterable[Envelope]) -> None:
+        """Send several envelopes back to back on this thread's connection.
+
+        All messages are rendered before the socket is touched. After a
+        disconnect the batch resumes on a fresh connection from the envelope
+        that failed.
+        """
+
+        for raw_message in [_build_wire_bytes(env) for env in envs]:
+            self._send_raw(raw_message)
+
+    def close(self) -> None:
+        """Close the calling thread's connection to this server, if any."""
+
+        conn = _thread_connections().pop(self.address, None)
+        if conn is not None:
+            conn.close()
+
+
+class SmtpConnectionPool:
+    """Bounded pool of SMTP connections borrowed by threads for a batch.
+
+    At most ``size`` connections are open at once; a thread borrows one for a
+    ``send_many`` call and returns it afterwards. Each connection is replaced
+    after ``max_sends`` messages so long-lived sessions never hit server-side
+    per-connection limits, and probed with NOOP before reuse once it sat idle
+    for ``idle_probe`` seconds.
+    """
+
+    def __init__(
+        self,
+        host: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        *,
+        size: int = 5,
+        max_sends: int = MAX_SENDS_PER_CONNECTION,
+        idle_probe: float = IDLE_PROBE_SECONDS,
+    ) -> None:
+        self.address = (host, port)
+        self.max_sends = max_sends
+        self.idle_probe = idle_probe
+        self._idle: "queue.Queue[_Connection]" = queue.Queue(maxsize=size)
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _acquire(self) -> _Connection:
+        self._slots.acquire()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        else:
+            if time.monotonic() - conn.last_used < self.idle_probe or conn.is_alive():
+                return conn
+            conn.close()
+        try:
+            return _Connection(*self.address)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, conn: Optional[_Connection]) -> None:
+        if conn is not None:
+            if conn.sends >= self.max_sends:
+                conn.close()
+            else:
+                self._idle.put_nowait(conn)
+        self._slots.release()
+
+    def send(self, env: Envelope) -> None:
+        """Send a single envelope on a borrowed connection."""
+
+        self.send_many([env])
+
+    def send_many(self, envs: Iterable[Envelope]) -> None:
+        """Send envelopes back to back on one borrowed connection."""
+
+        raw_messages = [_build_wire_bytes(env) for env in envs]
+        conn: Optional[_Connection] = self._acquire()
+        try:
+            for raw_message in raw_messages:
+                if conn.sends >= self.max_sends:
+                    conn.close()
+                    conn = None
+                    conn = _Connection(*self.address)
+                try:
+                    conn.sendmail(raw_message)
+                except _RECONNECT_ERRORS as exc:
+                    if not _connection_lost(exc):
+                        raise
+                    conn.close()
+                    conn = None
+                    conn = _Connection(*self.address)
+                    conn.sendmail(raw_message)
+        except BaseException:
+            if conn is not None:
+                conn.close()
+            conn = None
+            raise
+        finally:
+            self._release(conn)
+
+    def close(self) -> None:
+        """Close every idle connection in the pool."""
+
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_DEFAULT_SENDER = SmtpSender()
 
 
 def send_envelope_via_smtp(env: Envelope) -> None:
-    """Send the envelope to Postfix via SMTP on localhost."""
+    """Send the envelope to Postfix via SMTP on localhost.
+
+    Reuses the calling thread's cached connection (see ``SmtpSender``).
+    """
+
+    _DEFAULT_SENDER.send(env)
+
+
+def send_envelopes_batch(envs: Iterable[Envelope]) -> None:
+    """Send several envelopes back to back over the cached connection."""
 
-    mime_message = _envelope_to_mime(env)
+    _DEFAULT_SENDER.send_many(envs)
 
-    # SMTP envelope addresses must be addr-spec, not ActivityPub IDs.
-    smtp_from = "agent@localhost"
-    smtp_to = ["worker@localhost"]
 
-    with smtplib.SMTP("localhost", 25) as smtp:
-        smtp.sendmail(smtp_from, smtp_to, mime_message.as_string())
+@atexit.register
+def _close_all_connections() -> None:
+    for conn in list(_OPEN_CONNECTIONS):
+        conn.close()
 
 
-__all__ = ["send_envelope_via_smtp", "_envelope_to_mime"]
+__all__ = [
+    "SmtpConnectionPool",
+    "SmtpSender",
+    "send_envelope_via_smtp",
+    "send_envelopes_batch",
+    "_envelope_to_mime",
+]
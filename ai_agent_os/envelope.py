@@ -1,13 +1,21 @@
 """Envelope dataclass for AI Agent OS messaging."""
 from __future__ import annotations
 
-import json
+import functools
+import operator
 import re
 import uuid
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional, Union
 
+import orjson
+
+try:  # C ISO 8601 parser when available; stdlib otherwise.
+    from ciso8601 import parse_datetime as _parse_datetime
+except ImportError:  # pragma: no cover - optional dependency
+    _parse_datetime = datetime.fromisoformat
+
 AgentID = str
 PayloadType = Union[str, Dict[str, Any]]
 
@@ -15,15 +23,95 @@ PayloadType = Union[str, Dict[str, Any]]
 _AGENT_ID_PATTERN = re.compile(r"^https?://[^/]+/@[^/]+$")
 
 
+@functools.lru_cache(maxsize=1024)
+def _is_valid_agent_id(agent_id: str) -> bool:
+    # Cheap structural checks reject most bad IDs before the regex runs; the
+    # cache turns the common repeated sender/recipient into a dict lookup.
+    return (
+        agent_id.startswith(("http://", "https://"))
+        and "/@" in agent_id
+        and _AGENT_ID_PATTERN.match(agent_id) is not None
+    )
+
+
+# Frozen dataclasses still need to fill their caches.
+_set = object.__setattr__
+
+_REQUIRED_FIELDS = ("id", "type", "from", "to", "time")
+_get_required = operator.itemgetter(*_REQUIRED_FIELDS)
+
+
 def _validate_agent_id(agent_id: AgentID) -> None:
-    if not _AGENT_ID_PATTERN.match(agent_id):
+    if not (isinstance(agent_id, str) and _is_valid_agent_id(agent_id)):
         raise ValueError(
             "Agent ID must follow ActivityPub style (e.g., https://domain/@name)."
         )
 
 
-@dataclass
-class Envelope:
+def _readonly(self: Any, *args: Any, **kwargs: Any) -> None:
+    raise TypeError(f"{type(self).__name__} is read-only")
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict) and type(value) is not FrozenPayload:
+        return FrozenPayload(value)
+    if isinstance(value, list) and type(value) is not _FrozenList:
+        return _FrozenList(value)
+    return value
+
+
+class _FrozenList(list):
+    """Read-only JSON array nested inside a :class:`FrozenPayload`."""
+
+    __slots__ = ()
+
+    def __init__(self, items: Any = ()) -> None:
+        super().__init__(_freeze(item) for item in items)
+
+    def __reduce__(self) -> Any:
+        return _FrozenList, (list(self),)
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+
+
+class FrozenPayload(dict):
+    """Read-only JSON object payload that is serialized exactly once.
+
+    Handlers with constant replies can share a single instance; the SMTP
+    sender splices :attr:`json` into the message body instead of re-encoding
+    the dict for every envelope. Nested dicts and lists are frozen as well, so
+    a shared instance cannot drift from its cached :attr:`json`.
+    """
+
+    __slots__ = ("json",)
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(
+            (key, _freeze(value)) for key, value in dict(*args, **kwargs).items()
+        )
+        self.json: bytes = orjson.dumps(self)
+
+    def __reduce__(self) -> Any:
+        # Rebuild through __init__; the default protocol replays __setitem__.
+        return FrozenPayload, (dict(self),)
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+
+class _SerializationCache:
+    """Slots for serialized forms cached on an envelope; kept out of its fields.
+
+    The dataclass-generated pickle/copy state only carries fields, so a copied
+    envelope starts with these slots unset; readers use ``getattr`` defaults.
+    """
+
+    __slots__ = ("_payload_json", "_iso_time", "_json")
+
+
+@dataclass(frozen=True, slots=True)
+class Envelope(_SerializationCache):
     """
     AI Message Envelope v0.1.
 
@@ -37,6 +125,11 @@ class Envelope:
         context: Optional thread context identifier.
         in_reply_to: Optional identifier of the message being replied to.
         version: Envelope schema version (defaults to "v0.1").
+
+    Envelopes are frozen so that reassigning a field cannot leave the cached
+    JSON forms stale; use ``dataclasses.replace`` to derive a modified copy.
+    The payload dict itself is not copied, so mutating it in place after the
+    envelope is built still leaves the caches stale and must be avoided.
     """
 
     id: str
@@ -52,14 +145,21 @@ class Envelope:
     def __post_init__(self) -> None:
         _validate_agent_id(self.sender)
         _validate_agent_id(self.recipient)
-        if not isinstance(self.payload, (str, dict)):
+        payload_json = None
+        if type(self.payload) is FrozenPayload:
+            payload_json = self.payload.json
+        elif isinstance(self.payload, dict):
+            # Doubles as the serializability check; kept for the send path.
+            payload_json = orjson.dumps(self.payload)
+        elif not isinstance(self.payload, str):
             raise TypeError("payload must be a JSON object (dict) or text string")
-        if isinstance(self.payload, dict):
-            json.dumps(self.payload)  # ensure JSON-serializable
         if not isinstance(self.created_at, datetime):
             raise TypeError("created_at must be a datetime instance")
         if self.created_at.tzinfo is None:
-            self.created_at = self.created_at.replace(tzinfo=timezone.utc)
+            _set(self, "created_at", self.created_at.replace(tzinfo=timezone.utc))
+        _set(self, "_payload_json", payload_json)
+        _set(self, "_iso_time", None)
+        _set(self, "_json", None)
 
     @classmethod
     def new(
@@ -78,7 +178,7 @@ class Envelope:
         """Convenience constructor with sensible defaults."""
 
         return cls(
-            id=envelope_id or str(uuid.uuid4()),
+            id=envelope_id or uuid.uuid4().hex,
             envelope_type=envelope_type,
             sender=sender,
             recipient=recipient,
@@ -89,6 +189,27 @@ class Envelope:
             version=version,
         )
 
+    def payload_json(self) -> bytes:
+        """Return the payload as JSON bytes, serialized at most once.
+
+        Payloads are treated as immutable once the envelope is built.
+        """
+
+        payload_json = getattr(self, "_payload_json", None)
+        if payload_json is None:
+            payload_json = orjson.dumps(self.payload)
+            _set(self, "_payload_json", payload_json)
+        return payload_json
+
+    def iso_time(self) -> str:
+        """Return ``created_at`` in ISO 8601 form, formatted at most once."""
+
+        iso_time = getattr(self, "_iso_time", None)
+        if iso_time is None:
+            iso_time = self.created_at.isoformat()
+            _set(self, "_iso_time", iso_time)
+        return iso_time
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert envelope to a JSON-serializable dictionary."""
 
@@ -99,7 +220,7 @@ class Envelope:
             "to": self.recipient,
             "type": self.envelope_type,
             "payload": self.payload,
-            "time": self.created_at.isoformat(),
+            "time": self.iso_time(),
             "context": self.context,
             "inReplyTo": self.in_reply_to,
         }
@@ -109,41 +230,59 @@ class Envelope:
         """Create an envelope instance from a dictionary."""
 
         try:
-            created_at_raw = data["time"]
+            envelope_id, envelope_type, sender, recipient, created_at_raw = _get_required(data)
         except KeyError as exc:
-            raise KeyError("Missing required field 'time'") from exc
+            missing = next(name for name in _REQUIRED_FIELDS if name not in data)
+            raise KeyError(f"Missing required field {missing!r}") from exc
 
         created_at = (
-            datetime.fromisoformat(created_at_raw)
+            _parse_datetime(created_at_raw)
             if isinstance(created_at_raw, str)
             else created_at_raw
         )
 
+        get = data.get
         return cls(
-            id=data["id"],
-            envelope_type=data["type"],
-            sender=data["from"],
-            recipient=data["to"],
-            payload=data.get("payload"),
+            id=envelope_id,
+            envelope_type=envelope_type,
+            sender=sender,
+            recipient=recipient,
+            payload=get("payload"),
             created_at=created_at,
-            context=data.get("context"),
-            in_reply_to=data.get("inReplyTo"),
-            version=data.get("version", "v0.1"),
+            context=get("context"),
+            in_reply_to=get("inReplyTo"),
+            version=get("version", "v0.1"),
         )
 
     def to_json(self, *, indent: Optional[int] = None) -> str:
-        """Serialize the envelope to a JSON string."""
+        """Serialize the envelope to a JSON string.
+
+        Any truthy ``indent`` pretty-prints with two-space indentation, the only
+        indentation orjson supports. The compact form is cached, since envelopes
+        are not modified once built.
+        """
+
+        if indent:
+            return orjson.dumps(self.to_dict(), option=orjson.OPT_INDENT_2).decode("utf-8")
+        return self.to_json_bytes().decode("utf-8")
+
+    def to_json_bytes(self) -> bytes:
+        """Serialize the envelope to compact UTF-8 JSON bytes, ready to write."""
 
-        return json.dumps(self.to_dict(), ensure_ascii=False, indent=indent)
+        raw_json = getattr(self, "_json", None)
+        if raw_json is None:
+            raw_json = orjson.dumps(self.to_dict())
+            _set(self, "_json", raw_json)
+        return raw_json
 
     @classmethod
-    def from_json(cls, raw_json: str) -> "Envelope":
-        """Deserialize a JSON string into an envelope instance."""
+    def from_json(cls, raw_json: Union[str, bytes]) -> "Envelope":
+        """Deserialize a JSON string (or UTF-8 bytes) into an envelope instance."""
 
-        data = json.loads(raw_json)
+        data = orjson.loads(raw_json)
         if not isinstance(data, dict):
             raise ValueError("Envelope JSON must represent an object")
         return cls.from_dict(data)
 
 
-__all__ = ["Envelope", "AgentID", "PayloadType"]
+__all__ = ["Envelope", "FrozenPayload", "AgentID", "PayloadType"]
@@ -14,9 +14,13 @@ import ai_agent_hub.agent_worker as agent_worker
 import ai_agent_hub.lmtp_handler as lmtp_handler
 
 
-@pytest.fixture(autouse=True)
+@pytest.fixture()
 def queue_dirs(tmp_path, monkeypatch):
-    """Isolate queue/processed directories per test and patch module globals."""
+    """Isolate queue/processed directories per test and patch module globals.
+
+    Only tests that go through the queue request this; handler-level tests
+    call ``_handle_envelope`` directly and never touch the filesystem.
+    """
 
     queue_dir = tmp_path / "queue"
     processed_dir = tmp_path / "processed"
@@ -25,6 +29,7 @@ def queue_dirs(tmp_path, monkeypatch):
 
     monkeypatch.setattr(agent_worker, "get_queue_dir", lambda: queue_dir)
     monkeypatch.setattr(agent_worker, "PROCESSED_DIR", processed_dir)
+    monkeypatch.setattr(agent_worker, "FAILED_DIR", tmp_path / "failed")
     monkeypatch.setattr(lmtp_handler, "get_queue_dir", lambda: queue_dir)
 
     return queue_dir, processed_dir
@@ -39,7 +44,11 @@ def sent_envelopes(monkeypatch) -> List[Envelope]:
     def _fake_send(env: Envelope) -> None:
         captured.append(env)
 
+    def _fake_send_batch(envs: List[Envelope]) -> None:
+        captured.extend(envs)
+
     monkeypatch.setattr(agent_worker, "send_envelope_via_smtp", _fake_send)
+    monkeypatch.setattr(agent_worker, "send_envelopes_batch", _fake_send_batch)
     return captured
 
 
@@ -49,7 +58,7 @@ def enqueue(queue_dirs):
 
     def _enqueue(env: Envelope) -> Path:
         file_path = queue_dir / f"{env.id}.json"
-        file_path.write_text(env.to_json(indent=2), encoding="utf-8")
+        file_path.write_bytes(env.to_json_bytes())
         return file_path
 
     return _enqueue
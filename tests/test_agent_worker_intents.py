@@ -1,3 +1,5 @@
+import pytest
+
 from ai_agent_hub import Envelope
 from ai_agent_hub.agent_worker import INTENT_HANDLERS, _handle_envelope
 
@@ -28,6 +30,13 @@ def test_unknown_intent_reply_error():
     assert reply.payload == {"error": "unknown intent"}
 
 
+def test_handlers_registered_through_the_dict_are_dispatched(monkeypatch):
+    monkeypatch.setitem(INTENT_HANDLERS, "shout", lambda env: {"shout": "HI"})
+
+    assert _handle_envelope(_make_env({"intent": "shout"})).payload == {"shout": "HI"}
+    assert "shout" in _handle_envelope(_make_env({"intent": "help"})).payload["intents"]
+
+
 def test_echo_intent_roundtrip():
     env = _make_env({"intent": "echo", "text": "hello"})
     reply = _handle_envelope(env)
@@ -35,6 +44,13 @@ def test_echo_intent_roundtrip():
     assert reply.payload == {"echo": "hello"}
 
 
+def test_echo_without_text_returns_payload_object():
+    payload = {"intent": "echo", "data": [1, 2]}
+    reply = _handle_envelope(_make_env(payload))
+    assert reply is not None
+    assert reply.payload == {"echo": payload}
+
+
 def test_summarize_intent_shortens_text():
     long_text = "word " * 100
     env = _make_env({"intent": "summarize", "text": long_text})
@@ -54,3 +70,8 @@ def test_help_lists_registered_intents():
     assert isinstance(intents, list)
     assert "ping" in intents
     assert set(intents) >= {"ping", "echo", "help", "list-intents", "summarize"}
+
+
+@pytest.mark.parametrize("payload", ["ping", {}, {"intent": 1}, {"intent": None}])
+def test_missing_intent_is_skipped(payload):
+    assert _handle_envelope(_make_env(payload)) is None
@@ -11,6 +11,7 @@ localhost:25 and the asyncio LMTP server being able to start.
 """
 from __future__ import annotations
 
+import fnmatch
 import json
 import os
 import socket
@@ -19,11 +20,16 @@ import subprocess
 import sys
 import time
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 import unittest
 
 import pytest
 
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:  # pragma: no cover - optional dependency
+    INotify = None
+
 from ai_agent_hub import Envelope
 from ai_agent_hub.agent_worker import PROCESSED_DIR, process_next_envelope
 from ai_agent_hub.lmtp_handler import get_queue_dir
@@ -34,14 +40,29 @@ def clean_dirs() -> None:
     """Remove all files inside queue and processed directories."""
 
     for directory in (get_queue_dir(), PROCESSED_DIR):
-        if directory.exists():
-            for path in directory.iterdir():
-                if path.is_file():
-                    path.unlink()
-        else:
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        os.unlink(entry.path)
+        except FileNotFoundError:
             directory.mkdir(parents=True, exist_ok=True)
 
 
+def _wait_until_listening(address: Tuple[str, int], timeout_sec: float) -> bool:
+    """Probe ``address`` until it accepts a connection or the deadline passes."""
+
+    deadline = time.monotonic() + timeout_sec
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(address, timeout=0.05).close()
+        except OSError:
+            time.sleep(0.01)
+        else:
+            return True
+    return False
+
+
 def run_lmtp_server_background() -> subprocess.Popen:
     """Start the asyncio LMTP server as a background subprocess."""
 
@@ -57,13 +78,7 @@ def run_lmtp_server_background() -> subprocess.Popen:
         stderr=subprocess.STDOUT,
         env=env,
     )
-    for _ in range(50):
-        time.sleep(0.1)
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-            result = sock.connect_ex(("127.0.0.1", 8024))
-        if result == 0:
-            break
-    else:
+    if not _wait_until_listening(("127.0.0.1", 8024), timeout_sec=5.0):
         debug_log = Path("/tmp/lmtp_debug.log")
         if debug_log.exists():
             print("=== LMTP DEBUG LOG ===")
@@ -80,17 +95,45 @@ def run_agent_worker_once() -> bool:
 
 
 def wait_for_file_in_queue(pattern: str, timeout_sec: float = 5.0) -> Optional[Path]:
-    """Wait for a file matching pattern to appear in the queue directory."""
+    """Wait for a file matching pattern to appear in the queue directory.
+
+    Blocks on inotify when ``inotify_simple`` is available and polls otherwise.
+    """
 
+    queue_dir = get_queue_dir()
     deadline = time.monotonic() + timeout_sec
+    if INotify is not None:
+        return _wait_with_inotify(queue_dir, pattern, deadline)
     while time.monotonic() < deadline:
-        matches = list(get_queue_dir().glob(pattern))
-        if matches:
-            return matches[0]
+        match = _first_match(queue_dir, pattern)
+        if match:
+            return match
         time.sleep(0.1)
     return None
 
 
+def _first_match(queue_dir: Path, pattern: str) -> Optional[Path]:
+    with os.scandir(queue_dir) as entries:
+        for entry in entries:
+            if fnmatch.fnmatch(entry.name, pattern) and entry.is_file():
+                return Path(entry.path)
+    return None
+
+
+def _wait_with_inotify(queue_dir: Path, pattern: str, deadline: float) -> Optional[Path]:
+    with INotify() as inotify:
+        # Watch before the initial glob so a file landing in between is not missed.
+        inotify.add_watch(queue_dir, inotify_flags.CREATE | inotify_flags.MOVED_TO)
+        match = _first_match(queue_dir, pattern)
+        if match:
+            return match
+        while (remaining := deadline - time.monotonic()) > 0:
+            for event in inotify.read(timeout=int(remaining * 1000) + 1):
+                if fnmatch.fnmatch(event.name, pattern):
+                    return queue_dir / event.name
+    return None
+
+
 def send_test_envelope_via_smtp(env: Envelope) -> None:
     """Send the provided envelope via SMTP to localhost:25."""
 
@@ -134,11 +177,9 @@ class TestE2EPipeline(unittest.TestCase):
             payload={"intent": "ping"},
         )
 
+        # Returns once the LMTP port accepts connections.
         process = run_lmtp_server_background()
         try:
-            # Give LMTP server time to start listening.
-            time.sleep(0.5)
-
             send_test_envelope_via_smtp(env)
 
             incoming = wait_for_file_in_queue("*.json", timeout_sec=5)
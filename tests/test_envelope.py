@@ -0,0 +1,124 @@
+import copy
+import dataclasses
+import pickle
+
+import pytest
+
+from ai_agent_hub import Envelope, FrozenPayload
+
+
+def _new(sender="https://example.com/@alice", payload=None):
+    return Envelope.new(
+        envelope_type="command",
+        sender=sender,
+        recipient="https://agent.local/@worker",
+        payload={"intent": "ping"} if payload is None else payload,
+    )
+
+
+@pytest.mark.parametrize("agent_id", [
+    "https://example.com/@alice",
+    "http://agent.local/@worker_1.bot",
+])
+def test_valid_agent_ids(agent_id):
+    assert _new(agent_id).sender == agent_id
+
+
+@pytest.mark.parametrize("agent_id", [
+    "",
+    "agent@localhost",
+    "ftp://example.com/@alice",
+    "https://example.com/alice",
+    "https://example.com/@alice/inbox",
+    None,
+])
+def test_invalid_agent_ids(agent_id):
+    with pytest.raises(ValueError):
+        _new(agent_id)
+
+
+def test_payload_json_is_serialized_once():
+    env = _new()
+    assert env.payload_json() is env.payload_json()
+    assert env.payload_json() == b'{"intent":"ping"}'
+
+
+def test_unserializable_payload_is_rejected():
+    with pytest.raises(TypeError):
+        _new(payload={"intent": object()})
+
+
+def test_compact_json_is_cached_and_round_trips():
+    env = _new()
+    assert env.to_json() == env.to_json()
+    assert env._json is not None
+    assert Envelope.from_json(env.to_json()) == env
+    assert Envelope.from_json(env.to_json(indent=2)) == env
+
+
+@pytest.mark.parametrize("field_name", ["id", "type", "from", "to", "time"])
+def test_from_dict_reports_missing_field(field_name):
+    data = _new().to_dict()
+    del data[field_name]
+    with pytest.raises(KeyError, match=repr(field_name)):
+        Envelope.from_dict(data)
+
+
+def test_changed_envelope_is_serialized_afresh():
+    env = _new()
+    env.to_json_bytes()
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        env.payload = {"intent": "echo"}
+
+    changed = dataclasses.replace(env, payload={"intent": "echo"})
+    assert changed.payload_json() == b'{"intent":"echo"}'
+    assert Envelope.from_json(changed.to_json_bytes()).to_dict() == changed.to_dict()
+    assert env.to_dict()["payload"] == {"intent": "ping"}
+
+
+def test_caches_are_not_dataclass_fields():
+    env = _new()
+    env.to_json_bytes()
+    assert not any(f.name.startswith("_") for f in dataclasses.fields(env))
+    assert set(dataclasses.asdict(env)) == {f.name for f in dataclasses.fields(env)}
+
+
+@pytest.mark.parametrize("clone", [
+    copy.copy,
+    copy.deepcopy,
+    lambda env: pickle.loads(pickle.dumps(env)),
+])
+def test_copied_envelope_serializes(clone):
+    env = _new()
+    env.to_json()
+    copied = clone(env)
+    assert copied == env
+    assert copied.to_json() == env.to_json()
+    assert copied.payload_json() == env.payload_json()
+    assert copied.iso_time() == env.iso_time()
+
+
+@pytest.mark.parametrize("clone", [
+    copy.copy,
+    copy.deepcopy,
+    lambda payload: pickle.loads(pickle.dumps(payload)),
+])
+def test_frozen_payload_can_be_copied(clone):
+    payload = FrozenPayload(intents=["echo", "ping"], meta={"n": 1})
+    copied = clone(payload)
+    assert type(copied) is FrozenPayload
+    assert copied == payload
+    assert copied.json == payload.json
+
+    env = _new(payload=payload)
+    assert clone(env).to_json() == env.to_json()
+
+
+def test_frozen_payload_freezes_nested_values():
+    payload = FrozenPayload(intents=["echo"], meta={"n": 1})
+    with pytest.raises(TypeError):
+        payload["intents"].append("ping")
+    with pytest.raises(TypeError):
+        payload["meta"]["n"] = 2
+    assert isinstance(payload["intents"], list)
+    assert payload.json == b'{"intents":["echo"],"meta":{"n":1}}'
@@ -1,7 +1,10 @@
+import os
+
 import pytest
 
+import ai_agent_hub.agent_worker as agent_worker
 from ai_agent_hub import Envelope
-from ai_agent_hub.agent_worker import INTENT_HANDLERS
+from ai_agent_hub.agent_worker import INTENT_HANDLERS, process_pending_envelopes
 
 
 def _make_env(payload) -> Envelope:
@@ -111,3 +114,63 @@ def test_unknown_intent(enqueue, process_once, sent_envelopes, queue_dirs):
     reply = sent_envelopes[0]
     _assert_reply_structure(reply, env)
     assert reply.payload == {"error": "unknown intent"}
+
+
+def test_partial_queue_files_are_ignored(process_once, sent_envelopes, queue_dirs):
+    queue_dir, processed_dir = queue_dirs
+    (queue_dir / "pending.json.tmp").write_bytes(b"{")
+
+    assert process_once() is False
+    assert not any(processed_dir.iterdir())
+    assert sent_envelopes == []
+
+
+def test_pending_envelopes_processed_as_batch(enqueue, sent_envelopes, queue_dirs):
+    queue_dir, processed_dir = queue_dirs
+    envs = [_make_env({"intent": "ping"}) for _ in range(3)]
+    for env in envs:
+        enqueue(env)
+
+    assert process_pending_envelopes(limit=2) == 2
+    assert len(list(queue_dir.iterdir())) == 1
+    assert process_pending_envelopes() == 1
+    assert not any(queue_dir.iterdir())
+    assert len(list(processed_dir.iterdir())) == 3
+
+    assert sorted(r.in_reply_to for r in sent_envelopes) == sorted(e.id for e in envs)
+
+
+def test_bad_file_mid_batch_is_parked_and_replies_still_sent(enqueue, sent_envelopes, queue_dirs):
+    queue_dir, processed_dir = queue_dirs
+    envs = [_make_env({"intent": "ping"}) for _ in range(3)]
+    paths = [enqueue(env) for env in envs]
+    bad = queue_dir / "bad.json"
+    bad.write_bytes(b"{bad")
+    # Order the batch as ping, ping, bad, ping.
+    for mtime, path in enumerate([paths[0], paths[1], bad, paths[2]]):
+        os.utime(path, (mtime, mtime))
+
+    assert process_pending_envelopes() == 4
+    assert not any(queue_dir.iterdir())
+    assert len(list(processed_dir.iterdir())) == 3
+    assert [p.name for p in agent_worker.FAILED_DIR.iterdir()] == ["bad.json"]
+    assert sorted(r.in_reply_to for r in sent_envelopes) == sorted(e.id for e in envs)
+
+
+def test_drain_skips_file_claimed_after_scan(enqueue, sent_envelopes, queue_dirs, monkeypatch):
+    claimed, kept = _make_env({"intent": "ping"}), _make_env({"intent": "ping"})
+    claimed_path = enqueue(claimed)
+    enqueue(kept)
+    pending = agent_worker._queued_files()
+
+    load = agent_worker._load_envelope
+
+    def _claimed_by_lmtp_worker(file_path):
+        if file_path == claimed_path:
+            claimed_path.unlink()
+        return load(file_path)
+
+    monkeypatch.setattr(agent_worker, "_load_envelope", _claimed_by_lmtp_worker)
+    agent_worker._drain(pending)
+
+    assert [r.in_reply_to for r in sent_envelopes] == [kept.id]
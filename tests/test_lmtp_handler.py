@@ -0,0 +1,54 @@
+from email.message import EmailMessage
+
+import pytest
+
+from ai_agent_hub import Envelope
+from ai_agent_hub.lmtp_handler import _extract_agent_id, _fast_parse, parse_message
+from ai_agent_hub.smtp_sender import _envelope_to_mime
+
+
+@pytest.mark.parametrize("raw_header, expected", [
+    ("https://example.com/@alice <agent@localhost>", "https://example.com/@alice"),
+    ("<https://example.com/@alice>", "https://example.com/@alice"),
+    ("https :\t//example.com/@alice", "https://example.com/@alice"),
+    ("http://agent.local/@worker_1.bot", "http://agent.local/@worker_1.bot"),
+])
+def test_extract_agent_id(raw_header, expected):
+    assert _extract_agent_id(raw_header) == expected
+
+
+@pytest.mark.parametrize("raw_header", [None, "", "agent@localhost"])
+def test_extract_agent_id_unknown(raw_header):
+    assert _extract_agent_id(raw_header) == "https://unknown/@unknown"
+
+
+def test_parse_message_fast_path_for_sender_output():
+    env = Envelope.new(
+        envelope_type="command",
+        sender="https://example.com/@alice",
+        recipient="https://agent.local/@worker",
+        payload={"intent": "echo", "text": "héllo"},
+    )
+    raw = b"Received: from localhost\r\n\tby hub\r\n" + _envelope_to_mime(env).as_bytes()
+
+    assert _fast_parse(raw) is not None
+    sender, recipient, body = parse_message(raw)
+    assert sender == env.sender
+    assert recipient == env.recipient
+    assert body["payload"] == env.payload
+
+
+def test_parse_message_multipart_falls_back():
+    msg = EmailMessage()
+    msg["From"] = "https://example.com/@alice <agent@localhost>"
+    msg["To"] = "https://agent.local/@worker <worker@localhost>"
+    msg.set_content('{"intent": "ping"}')
+    msg.add_attachment(b"\x00", maintype="application", subtype="octet-stream")
+    raw = msg.as_bytes()
+
+    assert _fast_parse(raw) is None
+    assert parse_message(raw) == (
+        "https://example.com/@alice",
+        "https://agent.local/@worker",
+        {"intent": "ping"},
+    )
@@ -0,0 +1,123 @@
+import asyncio
+import contextlib
+
+import pytest
+
+import ai_agent_hub.lmtp_server as lmtp_server
+from ai_agent_hub import Envelope
+from ai_agent_hub.lmtp_server import LMTPServer, read_data
+from ai_agent_hub.smtp_sender import _build_wire_bytes
+
+
+def _read(raw: bytes) -> bytes:
+    async def _run() -> bytes:
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        return await read_data(reader)
+
+    return asyncio.run(_run())
+
+
+@pytest.mark.parametrize("raw, expected", [
+    (b"Subject: hi\r\n\r\nbody\r\n.\r\n", b"Subject: hi\r\n\r\nbody\r\n"),
+    (b".\r\n", b""),
+    (b"ends with a dot.\r\nnext\r\n.\r\n", b"ends with a dot.\r\nnext\r\n"),
+    (b"..leading\r\n..\r\n.\r\n", b".leading\r\n.\r\n"),
+])
+def test_read_data(raw, expected):
+    assert _read(raw) == expected
+
+
+def test_read_data_caps_total_size_across_reads():
+    async def _run() -> bytes:
+        reader = asyncio.StreamReader(limit=64)
+        reader.feed_data(b"line ending in a dot.\r\n" * 100 + b".\r\n")
+        reader.feed_eof()
+        return await read_data(reader, max_size=1000)
+
+    with pytest.raises(asyncio.LimitOverrunError):
+        asyncio.run(_run())
+
+
+def test_oversized_data_gets_552(monkeypatch):
+    monkeypatch.setattr(lmtp_server, "MAX_MESSAGE_SIZE", 1000)
+
+    async def _run() -> bytes:
+        server = LMTPServer(port=0)
+        await server.start()
+        port = server._server.sockets[0].getsockname()[1]
+        serving = asyncio.create_task(server.serve_forever())
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(
+            b"LHLO test\r\nMAIL FROM:<agent@localhost>\r\nRCPT TO:<worker@localhost>\r\n"
+            b"DATA\r\n" + b"line ending in a dot.\r\n" * 100 + b".\r\nQUIT\r\n"
+        )
+        await writer.drain()
+        replies = await reader.read()
+        writer.close()
+        serving.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await serving
+        return replies
+
+    assert b"552 " in asyncio.run(_run())
+
+
+def test_read_data_leaves_following_commands():
+    async def _run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"body\r\n.\r\nQUIT\r\n")
+        reader.feed_eof()
+        data = await read_data(reader)
+        return data, await reader.readline()
+
+    assert asyncio.run(_run()) == (b"body\r\n", b"QUIT\r\n")
+
+
+def test_read_data_incomplete():
+    with pytest.raises(asyncio.IncompleteReadError):
+        _read(b"no terminator\r\n")
+
+
+def test_in_process_worker_handles_envelope(queue_dirs, monkeypatch):
+    queue_dir, processed_dir = queue_dirs
+    sent = []
+    monkeypatch.setattr(lmtp_server, "send_envelope_via_smtp", sent.append)
+    env = Envelope.new(
+        envelope_type="command",
+        sender="https://example.com/@alice",
+        recipient="https://agent.local/@worker",
+        payload={"intent": "ping"},
+    )
+
+    async def _run():
+        server = LMTPServer(port=0, workers=1)
+        await server.start()
+        port = server._server.sockets[0].getsockname()[1]
+        serving = asyncio.create_task(server.serve_forever())
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(
+            b"LHLO test\r\nMAIL FROM:<agent@localhost>\r\nRCPT TO:<worker@localhost>\r\n"
+            b"DATA\r\n" + _build_wire_bytes(env) + b"\r\n.\r\nQUIT\r\n"
+        )
+        await writer.drain()
+        await reader.read()
+        writer.close()
+
+        for _ in range(100):
+            if sent:
+                break
+            await asyncio.sleep(0.01)
+        serving.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await serving
+
+    asyncio.run(_run())
+
+    assert not any(queue_dir.iterdir())
+    assert len(list(processed_dir.iterdir())) == 1
+    assert len(sent) == 1
+    assert sent[0].payload == {"pong": True}
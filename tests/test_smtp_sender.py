@@ -0,0 +1,227 @@
+import smtplib
+from datetime import datetime, timedelta, timezone
+from email import message_from_bytes
+from email.utils import format_datetime
+from typing import List
+
+import orjson
+import pytest
+
+import ai_agent_hub.smtp_sender as smtp_sender
+from ai_agent_hub import Envelope, FrozenPayload
+from ai_agent_hub.lmtp_handler import parse_message
+
+
+class FakeSMTP:
+    instances: List["FakeSMTP"] = []
+
+    def __init__(self, host, port):
+        self.address = (host, port)
+        self.sent = []
+        self.fail_next = False
+        self.alive = True
+        FakeSMTP.instances.append(self)
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        if self.fail_next:
+            error = self.fail_next
+            self.fail_next = False
+            if error is True:
+                error = smtplib.SMTPServerDisconnected("gone")
+            raise error
+        self.sent.append((from_addr, to_addrs, msg))
+
+    def noop(self):
+        if not self.alive:
+            raise smtplib.SMTPServerDisconnected("gone")
+        return (250, b"OK")
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture()
+def fake_smtp(monkeypatch):
+    FakeSMTP.instances = []
+    monkeypatch.setattr(smtp_sender.smtplib, "SMTP", FakeSMTP)
+    smtp_sender._DEFAULT_SENDER.close()
+    yield FakeSMTP.instances
+    smtp_sender._DEFAULT_SENDER.close()
+
+
+def _make_env(payload=None) -> Envelope:
+    return Envelope.new(
+        envelope_type="reply",
+        sender="https://agent.local/@worker",
+        recipient="https://example.com/@alice",
+        payload={"pong": True} if payload is None else payload,
+        context="thread-1",
+    )
+
+
+@pytest.mark.parametrize("payload", [
+    FrozenPayload(pong=True),
+    {"echo": "héllo", "items": [1, 2]},
+    "plain text",
+])
+def test_body_bytes_matches_full_serialization(payload):
+    env = _make_env(payload)
+    assert orjson.loads(smtp_sender._body_bytes(env)) == {
+        "payload": payload,
+        "context": "thread-1",
+        "inReplyTo": None,
+        "time": env.created_at.isoformat(),
+        "version": "v0.1",
+    }
+
+
+@pytest.mark.parametrize("payload, cte", [
+    ({"pong": True}, "7bit"),
+    ({"echo": "héllo"}, "8bit"),
+    ({"echo": "x" * 2000}, "base64"),
+])
+def test_wire_bytes_match_mime_message(payload, cte):
+    env = _make_env(payload)
+    wire = smtp_sender._build_wire_bytes(env)
+    parsed = message_from_bytes(wire)
+    expected = smtp_sender._envelope_to_mime(env)
+
+    assert parsed["Content-Transfer-Encoding"] == expected["Content-Transfer-Encoding"] == cte
+    for header in ("Subject", "Date", "Message-ID"):
+        assert parsed[header] == expected[header]
+    assert parsed.get_payload(decode=True) == expected.get_payload(decode=True)
+    assert max(len(line) for line in wire.split(b"\r\n")) <= 998
+
+    sender, recipient, body = parse_message(wire)
+    assert (sender, recipient) == (env.sender, env.recipient)
+    assert body["payload"] == payload
+
+
+def test_frozen_payload_is_read_only():
+    payload = FrozenPayload(pong=True)
+    with pytest.raises(TypeError):
+        payload["pong"] = False
+    assert payload.json == b'{"pong":true}'
+
+
+def test_connection_is_reused(fake_smtp):
+    smtp_sender.send_envelope_via_smtp(_make_env())
+    smtp_sender.send_envelope_via_smtp(_make_env())
+
+    assert len(fake_smtp) == 1
+    assert len(fake_smtp[0].sent) == 2
+
+
+def test_reconnects_after_disconnect(fake_smtp):
+    smtp_sender.send_envelope_via_smtp(_make_env())
+    fake_smtp[0].fail_next = True
+    smtp_sender.send_envelope_via_smtp(_make_env())
+
+    assert len(fake_smtp) == 2
+    assert len(fake_smtp[0].sent) == 1
+    assert len(fake_smtp[1].sent) == 1
+
+
+def _idle_timeout():
+    return smtplib.SMTPSenderRefused(421, b"4.4.2 Error: timeout exceeded", "agent@localhost")
+
+
+def test_reconnects_after_idle_timeout_421(fake_smtp):
+    smtp_sender.send_envelope_via_smtp(_make_env())
+    fake_smtp[0].fail_next = _idle_timeout()
+    smtp_sender.send_envelope_via_smtp(_make_env())
+
+    assert [len(conn.sent) for conn in fake_smtp] == [1, 1]
+
+
+def test_refused_message_is_not_retried(fake_smtp):
+    smtp_sender.send_envelope_via_smtp(_make_env())
+    fake_smtp[0].fail_next = smtplib.SMTPSenderRefused(550, b"5.7.1 denied", "agent@localhost")
+    with pytest.raises(smtplib.SMTPSenderRefused):
+        smtp_sender.send_envelope_via_smtp(_make_env())
+
+    assert len(fake_smtp) == 1
+
+
+def test_idle_connection_is_probed_before_reuse(fake_smtp):
+    sender = smtp_sender.SmtpSender(idle_probe=0.0)
+    try:
+        sender.send(_make_env())
+        fake_smtp[0].alive = False
+        sender.send(_make_env())
+    finally:
+        sender.close()
+
+    assert [len(conn.sent) for conn in fake_smtp] == [1, 1]
+
+
+def test_pool_reconnects_after_idle_timeout_421(fake_smtp):
+    pool = smtp_sender.SmtpConnectionPool(size=1)
+    try:
+        pool.send(_make_env())
+        fake_smtp[0].fail_next = _idle_timeout()
+        pool.send(_make_env())
+        fake_smtp[1].alive = False
+        pool.idle_probe = 0.0
+        pool.send(_make_env())
+    finally:
+        pool.close()
+
+    assert [len(conn.sent) for conn in fake_smtp] == [1, 1, 1]
+
+
+def test_batch_shares_one_connection(fake_smtp):
+    smtp_sender.send_envelope_via_smtp(_make_env())
+    fake_smtp[0].fail_next = True
+    smtp_sender.send_envelopes_batch([_make_env() for _ in range(3)])
+
+    assert len(fake_smtp) == 2
+    assert len(fake_smtp[0].sent) == 1
+    assert len(fake_smtp[1].sent) == 3
+
+
+def test_sender_recycles_after_max_sends(fake_smtp):
+    sender = smtp_sender.SmtpSender("mx.local", 2525, max_sends=2)
+    try:
+        sender.send_many([_make_env() for _ in range(5)])
+    finally:
+        sender.close()
+
+    assert [len(conn.sent) for conn in fake_smtp] == [2, 2, 1]
+    assert all(conn.address == ("mx.local", 2525) for conn in fake_smtp)
+
+
+def test_pool_reuses_and_recycles_connections(fake_smtp):
+    pool = smtp_sender.SmtpConnectionPool(size=2, max_sends=3)
+    try:
+        pool.send_many([_make_env() for _ in range(2)])
+        pool.send(_make_env())
+        pool.send_many([_make_env() for _ in range(2)])
+    finally:
+        pool.close()
+
+    assert [len(conn.sent) for conn in fake_smtp] == [3, 2]
+
+
+def test_wire_bytes_fallback_uses_crlf():
+    env = Envelope.new(
+        envelope_type="reply",
+        sender="https://agent.local/@wörker",
+        recipient="https://example.com/@alice",
+        payload={"pong": True},
+    )
+    raw = smtp_sender._build_wire_bytes(env)
+
+    assert b"\n" not in raw.replace(b"\r\n", b"")
+    assert parse_message(raw)[2]["payload"] == {"pong": True}
+
+
+@pytest.mark.parametrize("created_at", [
+    datetime(2024, 5, 1, 12, 30, 15, 999999, tzinfo=timezone.utc),
+    datetime(2024, 5, 1, 21, 30, 15, tzinfo=timezone(timedelta(hours=9))),
+])
+def test_date_header_matches_format_datetime(created_at):
+    assert smtp_sender._date_header(created_at) == format_datetime(created_at)